@@ -1,11 +1,93 @@
 import streamlit as st
-import yt_dlp
-import whisper
 import re
 import os
-from ollama import chat
 import tempfile
+import requests
 import shutil
+import subprocess
+import sys
+import threading
+import time
+import numpy as np
+import collections
+import concurrent.futures
+import hashlib
+import math
+import queue
+import diskcache
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+# Precompiled subtitle cleaning patterns
+_RE_INLINE = re.compile(r'<[^>]+>|\[.*?\]|♪[^♪]*♪')
+_RE_WS = re.compile(r'\s+')
+_RE_WORD = re.compile(r'\w+')
+_RE_VTT_BLOCK = re.compile(r'^(?:WEBVTT|NOTE|STYLE|REGION)(?:\s|$)')
+
+# Question filler ignored when matching transcript passages
+_STOP_WORDS = frozenset('''
+    about above after again also and any are because been before being between both but can
+    could did does doing down during each few for from further had has have having her here
+    hers him his how into its just key main more most not now off once only other our out over
+    own same she should some such than that the their them then there these they this those
+    through too under until very was were what when where which while who whom why will with
+    would you your video videos content provide comprehensive summary summarize suggest
+    topics points covered
+'''.split())
+
+# Whisper decoding presets: greedy without timestamps by default, beam search when accuracy matters.
+# Both drop silent spans with the built-in Silero VAD so empty 30 s windows are never decoded.
+WHISPER_FAST_DECODING = {
+    "language": "en",
+    "without_timestamps": True,
+    "condition_on_previous_text": False,
+    "beam_size": 1,
+    "best_of": 1,
+    "vad_filter": True,
+}
+WHISPER_ACCURATE_DECODING = {
+    "language": "en",
+    "without_timestamps": True,
+    "condition_on_previous_text": True,
+    "beam_size": 5,
+    "best_of": 5,
+    "vad_filter": True,
+}
+
+# Seconds to wait for the subtitle probe (and its download fallback) before
+# falling back to transcribing the audio
+SUBTITLE_PROBE_TIMEOUT = 90
+
+# Speech chunks (split at VAD boundaries) decoded together per batch in fast mode
+WHISPER_BATCH_SIZE = 8
+
+# Seconds an extracted transcript stays in the on-disk cache
+DISK_CACHE_EXPIRE = 7 * 24 * 3600
+
+# Ollama chat model, override with the OLLAMA_MODEL environment variable
+OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "llama3.2:3b-instruct-q4_K_M")
+
+# Context window large enough for long transcripts
+OLLAMA_NUM_CTX = 8192
+
+# Transcript words per summarization request, leaving room for the prompt and the
+# answer (roughly 1.5 tokens per word of English speech)
+SUMMARY_CHUNK_WORDS = (OLLAMA_NUM_CTX - 1024) * 2 // 3
+
+# Keep the model loaded between questions
+OLLAMA_KEEP_ALIVE = "30m"
+OLLAMA_OPTIONS = {"num_ctx": OLLAMA_NUM_CTX}
+
+# Ollama already decodes on all physical cores; OLLAMA_NUM_THREAD overrides that for CPU-only hosts
+_OLLAMA_NUM_THREAD = os.environ.get("OLLAMA_NUM_THREAD", "").strip()
+if _OLLAMA_NUM_THREAD.isdigit() and int(_OLLAMA_NUM_THREAD) > 0:
+    OLLAMA_OPTIONS["num_thread"] = int(_OLLAMA_NUM_THREAD)
+
+# Summaries are capped at num_predict tokens so merge rounds always shrink
+OLLAMA_SUMMARY_OPTIONS = {**OLLAMA_OPTIONS, "num_predict": 512}
+
+# Redraw the streaming answer at most every 50 ms or 64 new characters
+STREAM_FLUSH_INTERVAL = 0.05
+STREAM_FLUSH_CHARS = 64
 
 # Page configuration
 st.set_page_config(
@@ -14,6 +96,9 @@ st.set_page_config(
     layout="wide"
 )
 
+if _OLLAMA_NUM_THREAD and "num_thread" not in OLLAMA_OPTIONS:
+    st.warning(f"Ignoring OLLAMA_NUM_THREAD={_OLLAMA_NUM_THREAD!r}: expected a positive integer")
+
 # Initialize session state
 if 'messages' not in st.session_state:
     st.session_state.messages = []
@@ -23,8 +108,37 @@ if 'content_loaded' not in st.session_state:
     st.session_state.content_loaded = False
 if 'chat_history' not in st.session_state:
     st.session_state.chat_history = []
+if 'summary' not in st.session_state:
+    st.session_state.summary = None
+
+@st.cache_resource
+def _get_whisper(name="tiny"):
+    """Load the Whisper model once per process and reuse it across reruns"""
+    # Heavy imports are deferred until a video actually needs transcription
+    import ctranslate2
+    from faster_whisper import WhisperModel
+    
+    if ctranslate2.get_cuda_device_count() > 0:
+        try:
+            model = WhisperModel(name, device="cuda", compute_type="float16")
+            # cuBLAS/cuDNN load lazily on the first encode, so exercise the model on
+            # one second of silence before trusting the GPU path
+            segments, _ = model.transcribe(np.zeros(16000, dtype=np.float32), language="en", beam_size=1)
+            list(segments)
+            return model
+        except Exception:
+            # CUDA runtime libraries missing or unusable, fall back to CPU
+            pass
+    return WhisperModel(name, device="cpu", compute_type="int8")
+
+@st.cache_resource
+def _get_whisper_pipeline(name="tiny"):
+    """Wrap the cached Whisper model for batched chunk-parallel transcription"""
+    from faster_whisper import BatchedInferencePipeline
+    
+    return BatchedInferencePipeline(model=_get_whisper(name))
 
-def extract_youtube_content(video_url):
+def extract_youtube_content(video_url, model_size="tiny", accurate=False):
     """Extract content from YouTube video"""
     progress_bar = st.progress(0)
     status_text = st.empty()
@@ -32,50 +146,174 @@ def extract_youtube_content(video_url):
     status_text.text("Processing video...")
     progress_bar.progress(10)
     
-    # Try subtitles first
-    status_text.text("Trying to extract subtitles...")
-    progress_bar.progress(30)
-    subtitle_text = get_subtitles(video_url)
+    # Run the cached core on a worker thread and relay its phases from here, since
+    # st.cache_data cannot replay writes to elements created outside the function
+    phases = queue.Queue()
+    executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=1,
+        initializer=add_script_run_ctx,
+        initargs=(None, get_script_run_ctx()),
+    )
+    future = executor.submit(_extract_content, video_url, model_size, accurate, phases.put)
+    executor.shutdown(wait=False)
     
-    if subtitle_text:
-        status_text.text("Subtitles extracted successfully!")
-        progress_bar.progress(100)
-        return subtitle_text
+    while not (future.done() and phases.empty()):
+        try:
+            message, value = phases.get(timeout=0.2)
+        except queue.Empty:
+            continue
+        status_text.text(message)
+        progress_bar.progress(value)
     
-    # If no subtitles, transcribe audio
-    status_text.text("No subtitles found. Transcribing audio...")
-    progress_bar.progress(50)
-    audio_text = transcribe_audio(video_url, progress_bar, status_text)
+    try:
+        content, source = future.result()
+    except RuntimeError:
+        # Raised after the failing step already reported its own error
+        status_text.text("Failed to extract content")
+        return None
+    except Exception as e:
+        st.error(f"Content extraction failed: {e}")
+        status_text.text("Failed to extract content")
+        return None
     
-    if audio_text:
+    if source == "subtitles":
+        status_text.text("Subtitles extracted successfully!")
+    else:
         status_text.text("Audio transcription completed!")
-        progress_bar.progress(100)
-        return audio_text
+    progress_bar.progress(100)
+    return content
+
+@st.cache_resource
+def _get_disk_cache():
+    """Open the on-disk content cache shared by all sessions"""
+    return diskcache.Cache(os.path.expanduser("~/.cache/yt-analyzer"))
+
+def _disk_cache_get(key):
+    """Best-effort disk cache lookup; an unusable cache counts as a miss"""
+    try:
+        return _get_disk_cache().get(key)
+    except Exception:
+        return None
+
+def _disk_cache_set(key, value):
+    """Best-effort disk cache store; a full or unwritable cache is skipped"""
+    try:
+        _get_disk_cache().set(key, value, expire=DISK_CACHE_EXPIRE)
+    except Exception:
+        pass
+
+@st.cache_data(ttl=3600, max_entries=64, show_spinner=False)
+def _extract_content(video_url, model_size, accurate, _on_phase=lambda phase: None):
+    """Return (content, source) for a video, memoized in memory and on disk
+
+    _on_phase receives (message, percent) tuples as extraction progresses.
+    """
+    # Subtitles don't depend on the ASR settings, so only transcripts key on them
+    subtitle_key = hashlib.sha1(video_url.encode("utf-8")).hexdigest()
+    audio_key = hashlib.sha1(f"{video_url}|{model_size}|{accurate}".encode("utf-8")).hexdigest()
+    cached = _disk_cache_get(subtitle_key) or _disk_cache_get(audio_key)
+    if cached:
+        return cached
+    
+    # Probe subtitles while the audio download starts in the background
+    _on_phase(("Trying to extract subtitles...", 30))
+    executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=2,
+        initializer=add_script_run_ctx,
+        initargs=(None, get_script_run_ctx()),
+    )
+    cancel_audio = threading.Event()
+    audio_future = executor.submit(_download_audio, video_url, cancel_audio)
+    subtitle_future = executor.submit(get_subtitles, video_url)
+    executor.shutdown(wait=False)
+    
+    try:
+        subtitle_text = subtitle_future.result(timeout=SUBTITLE_PROBE_TIMEOUT)
+    except concurrent.futures.TimeoutError:
+        subtitle_text = None
+    
+    if subtitle_text:
+        # Audio is not needed, stop the download
+        cancel_audio.set()
+        key, result = subtitle_key, (subtitle_text, "subtitles")
+    else:
+        # If no subtitles, transcribe audio
+        _on_phase(("No subtitles found. Downloading audio...", 50))
+        audio_text = transcribe_audio(audio_future, model_size, accurate, _on_phase)
+        if not audio_text:
+            # Raising keeps failures out of st.cache_data
+            raise RuntimeError("Failed to extract content")
+        key, result = audio_key, (audio_text, "audio")
+    
+    _disk_cache_set(key, result)
+    return result
+
+def _find_subtitle_track(video_url):
+    """Probe the video once and return its English SRT/VTT subtitle track, if any"""
+    import yt_dlp
+    
+    with yt_dlp.YoutubeDL({'skip_download': True}) as ydl:
+        info = ydl.extract_info(video_url, download=False)
+    
+    for tracks in (info.get('subtitles'), info.get('automatic_captions')):
+        formats = (tracks or {}).get('en')
+        if not formats:
+            continue
+        
+        track = next((f for f in formats if f.get('ext') in ('srt', 'vtt')), None)
+        if track:
+            return track
     
-    status_text.text("Failed to extract content")
     return None
 
+def _fetch_subtitles(track):
+    """Fetch a subtitle track straight into memory without writing to disk"""
+    response = requests.get(track['url'], timeout=20)
+    response.raise_for_status()
+    return clean_subtitle_text(response.text)
+
 def get_subtitles(video_url):
     """Extract and clean subtitles"""
     try:
+        track = _find_subtitle_track(video_url)
+    except Exception as e:
+        # A failed probe would only be repeated by the download fallback
+        st.error(f"Subtitle extraction failed: {e}")
+        return None
+    
+    if not track:
+        return None
+    
+    try:
+        return _fetch_subtitles(track)
+    except Exception:
+        # Fall back to letting yt-dlp download the subtitle file
+        pass
+    
+    try:
+        import yt_dlp
+        
         with tempfile.TemporaryDirectory() as temp_dir:
             ydl_opts = {
                 'writesubtitles': True,
                 'writeautomaticsubs': True,
                 'subtitleslangs': ['en'],
+                'subtitlesformat': 'srt/best',
                 'skip_download': True,
+                'postprocessors': [{'key': 'FFmpegSubtitlesConvertor', 'format': 'srt', 'when': 'before_dl'}],
                 'outtmpl': os.path.join(temp_dir, 'temp_subtitle.%(ext)s'),
             }
             
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
                 ydl.download([video_url])
             
-            subtitle_files = [f for f in os.listdir(temp_dir) if f.startswith('temp_subtitle') and f.endswith('.vtt')]
+            with os.scandir(temp_dir) as entries:
+                subtitle_path = next((e.path for e in entries if e.name.startswith('temp_subtitle') and e.name.endswith('.srt')), None)
             
-            if not subtitle_files:
+            if not subtitle_path:
                 return None
             
-            with open(os.path.join(temp_dir, subtitle_files[0]), 'r', encoding='utf-8') as f:
+            with open(subtitle_path, 'r', encoding='utf-8') as f:
                 content = f.read()
             
             return clean_subtitle_text(content)
@@ -84,79 +322,230 @@ def get_subtitles(video_url):
         st.error(f"Subtitle extraction failed: {e}")
         return None
 
-def transcribe_audio(video_url, progress_bar, status_text):
+def _drain_stderr(process, tail):
+    """Read a child's stderr on a daemon thread, keeping its last lines in tail"""
+    def drain():
+        with process.stderr:
+            for line in process.stderr:
+                tail.append(line.decode("utf-8", errors="replace").rstrip())
+    
+    thread = threading.Thread(target=drain, daemon=True)
+    thread.start()
+    return thread
+
+def _download_audio(video_url, cancel_event):
+    """Decode the audio track to 16 kHz mono float32 PCM in memory"""
+    ytdlp = subprocess.Popen(
+        [sys.executable, '-m', 'yt_dlp', '-q', '-f', 'bestaudio/best', '-o', '-', video_url],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
     try:
-        with tempfile.TemporaryDirectory() as temp_dir:
-            ydl_opts = {
-                'format': 'bestaudio/best',
-                'outtmpl': os.path.join(temp_dir, 'temp_audio.%(ext)s'),
-            }
-            
-            status_text.text("Downloading audio...")
-            progress_bar.progress(60)
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([video_url])
-            
-            audio_files = [f for f in os.listdir(temp_dir) if f.startswith('temp_audio')]
-            
-            if not audio_files:
+        ffmpeg = subprocess.Popen(
+            ['ffmpeg', '-loglevel', 'error', '-i', 'pipe:0', '-f', 's16le', '-ac', '1', '-ar', '16000', '-'],
+            stdin=ytdlp.stdout,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+    except Exception:
+        # Without a reader yt-dlp would block forever on its full stdout pipe
+        ytdlp.kill()
+        ytdlp.stdout.close()
+        ytdlp.stderr.close()
+        ytdlp.wait()
+        raise
+    # Let yt-dlp receive SIGPIPE if ffmpeg exits early
+    ytdlp.stdout.close()
+    
+    ytdlp_tail = collections.deque(maxlen=5)
+    ffmpeg_tail = collections.deque(maxlen=5)
+    drains = [_drain_stderr(ytdlp, ytdlp_tail), _drain_stderr(ffmpeg, ffmpeg_tail)]
+    
+    pcm = bytearray()
+    try:
+        for chunk in iter(lambda: ffmpeg.stdout.read(1 << 16), b''):
+            if cancel_event.is_set():
                 return None
-            
-            status_text.text("Loading AI model...")
-            progress_bar.progress(70)
-            model = whisper.load_model("base")
-            
-            status_text.text("Transcribing audio...")
-            progress_bar.progress(80)
-            result = model.transcribe(os.path.join(temp_dir, audio_files[0]))
-            
-            return result["text"].strip()
+            pcm += chunk
+    finally:
+        if cancel_event.is_set():
+            ffmpeg.kill()
+            ytdlp.kill()
+        ffmpeg.stdout.close()
+        ffmpeg.wait()
+        ytdlp.wait()
+        for drain in drains:
+            drain.join()
+    
+    if ffmpeg.returncode != 0 or ytdlp.returncode != 0:
+        # ffmpeg failing first makes yt-dlp die on a broken pipe, so report ffmpeg first
+        # and always include both tails
+        stage = "decoding" if ffmpeg.returncode != 0 else "download"
+        raise RuntimeError(
+            f"audio {stage} failed: "
+            f"ffmpeg ({ffmpeg.returncode}): {' | '.join(ffmpeg_tail) or 'no output'}; "
+            f"yt-dlp ({ytdlp.returncode}): {' | '.join(ytdlp_tail) or 'no output'}"
+        )
+    if not pcm:
+        return None
+    return np.frombuffer(pcm, np.int16).astype(np.float32) / 32768.0
+
+def transcribe_audio(audio_future, model_size="tiny", accurate=False, on_phase=lambda phase: None):
+    """Transcribe the audio fetched by a pending _download_audio call"""
+    try:
+        audio = audio_future.result()
+        
+        if audio is None:
+            return None
+        
+        on_phase(("Transcribing audio...", 80))
+        if accurate:
+            # The batched pipeline never conditions on previous text and only tries the
+            # first temperature, so accurate decoding runs sequentially on the plain model
+            model = _get_whisper(model_size)
+            segments, _ = model.transcribe(audio, **WHISPER_ACCURATE_DECODING)
+        else:
+            pipeline = _get_whisper_pipeline(model_size)
+            segments, _ = pipeline.transcribe(audio, batch_size=WHISPER_BATCH_SIZE, **WHISPER_FAST_DECODING)
+        
+        return " ".join(segment.text.strip() for segment in segments)
         
     except Exception as e:
         st.error(f"Audio transcription failed: {e}")
         return None
 
-def clean_subtitle_text(vtt_content):
-    """Clean VTT subtitle content"""
-    content = re.sub(r'^WEBVTT.*?\n\n', '', vtt_content, flags=re.MULTILINE | re.DOTALL)
-    content = re.sub(r'\d{2}:\d{2}:\d{2}\.\d{3} --> \d{2}:\d{2}:\d{2}\.\d{3}.*?\n', '', content)
-    content = re.sub(r'<[^>]+>', '', content)
-    content = re.sub(r'\[.*?\]', '', content)
-    content = re.sub(r'♪.*?♪', '', content)
-    content = re.sub(r'\n+', ' ', content)
-    content = re.sub(r'\s+', ' ', content)
-    return content.strip()
+def clean_subtitle_text(subtitle_content):
+    """Clean SRT/VTT subtitle content in a single pass over its lines"""
+    lines = subtitle_content.splitlines()
+    out = []
+    skip_block = False
+    block_start = True
+    for i, line in enumerate(lines):
+        line = line.strip()
+        if not line:
+            skip_block = False
+            block_start = True
+            continue
+        first_in_block, block_start = block_start, False
+        if skip_block:
+            continue
+        if first_in_block and _RE_VTT_BLOCK.match(line):
+            # Header, NOTE, STYLE and REGION blocks run until the next blank line
+            skip_block = True
+            continue
+        if "-->" in line:
+            continue
+        if first_in_block and i + 1 < len(lines) and "-->" in lines[i + 1]:
+            # Cue identifier (SRT sequence number or VTT cue id)
+            continue
+        out.append(_RE_INLINE.sub('', line))
+    return _RE_WS.sub(' ', ' '.join(out)).strip()
 
-def initialize_with_content(youtube_content):
-    st.session_state.messages = []
+def _summarize_chunk(instruction, text):
+    """Run one summarization request against the chat model"""
+    from ollama import chat
     
-    system_msg = {
-        "role": "system",
-        "content": "You are a YouTube video content assistant. Help users analyze video content, suggest topics, titles, thumbnails, and provide YouTube strategy advice."
-    }
-    st.session_state.messages.append(system_msg)
+    response = chat(
+        model=OLLAMA_MODEL,
+        messages=[{
+            "role": "user",
+            "content": f"{instruction}\n{text}"
+        }],
+        stream=False,
+        options=OLLAMA_SUMMARY_OPTIONS,
+        keep_alive=OLLAMA_KEEP_ALIVE,
+    )
+    return response['message']['content']
+
+def _split_words(text, max_words):
+    """Split text into pieces of at most max_words words"""
+    words = text.split()
+    return [' '.join(words[i:i + max_words]) for i in range(0, len(words), max_words)] or [text]
+
+def _group_summaries(summaries, max_words):
+    """Pack whole summaries into newline-preserving groups of at most max_words words"""
+    groups, current, current_words = [], [], 0
+    for summary in summaries:
+        words = len(summary.split())
+        if current and current_words + words > max_words:
+            groups.append("\n\n".join(current))
+            current, current_words = [], 0
+        current.append(summary)
+        current_words += words
+    if current:
+        groups.append("\n\n".join(current))
+    return groups
+
+def _truncate_lines(text, max_words):
+    """Keep whole lines of text until max_words words are used"""
+    kept, used = [], 0
+    for line in text.splitlines():
+        used += len(line.split())
+        if used > max_words:
+            break
+        kept.append(line)
+    return "\n".join(kept)
+
+def _summarize_content(youtube_content):
+    """Condense the transcript once so chat turns don't re-send all of it"""
+    merge_instruction = "Merge these partial summaries of one YouTube video into dense bullet points in at most 400 tokens:"
     
-    content_msg = {
-        "role": "user", 
-        "content": f"Here is the YouTube content I want you to analyze and remember for our conversation: {youtube_content}"
-    }
-    st.session_state.messages.append(content_msg)
+    # Map: summarize pieces that fit the context window, so nothing is truncated
+    summaries = [
+        _summarize_chunk("Summarize this part of a YouTube video transcript as dense bullet points in at most 400 tokens:", chunk)
+        for chunk in _split_words(youtube_content, SUMMARY_CHUNK_WORDS)
+    ]
+    
+    # Reduce: merge whole partial summaries until a single one remains
+    while len(summaries) > 1:
+        groups = _group_summaries(summaries, SUMMARY_CHUNK_WORDS)
+        if len(groups) >= len(summaries):
+            # A round would not shrink anything, so do one last merge of what fits
+            joined = _truncate_lines("\n\n".join(summaries), SUMMARY_CHUNK_WORDS)
+            return _summarize_chunk(merge_instruction, joined)
+        summaries = [_summarize_chunk(merge_instruction, group) for group in groups]
+    return summaries[0]
+
+def _retrieve_snippets(question, transcript, k=3, passage_words=60):
+    """Return the transcript passages best matching the question, weighting rare words higher"""
+    terms = {w for w in _RE_WORD.findall(question.lower()) if len(w) > 2 and w not in _STOP_WORDS}
+    if not terms:
+        return []
+    
+    passages = _split_words(transcript, passage_words)
+    passage_terms = [terms.intersection(_RE_WORD.findall(passage.lower())) for passage in passages]
+    
+    # IDF over passages, so words found everywhere in the transcript carry no weight
+    idf = {}
+    for term in terms:
+        df = sum(term in found for found in passage_terms)
+        if df:
+            idf[term] = math.log(len(passages) / df)
+    
+    scored = []
+    for idx, found in enumerate(passage_terms):
+        score = sum(idf[term] for term in found)
+        if score > 0:
+            scored.append((score, idx))
+    
+    top = sorted(scored, reverse=True)[:k]
+    return [passages[idx] for _, idx in sorted(top, key=lambda item: item[1])]
+
+def initialize_with_content(youtube_content):
+    st.session_state.messages = []
     
-    # Get initial acknowledgment
     try:
-        stream = chat(
-            model='llama2',
-            messages=st.session_state.messages,
-            stream=False,
-        )
-        response = stream['message']['content']
+        st.session_state.summary = _summarize_content(youtube_content)
         
-        ass_msg = {
-            "role": "assistant",
-            "content": response
+        # Single stable system prefix so Ollama can reuse its KV cache across turns
+        system_msg = {
+            "role": "system",
+            "content": (
+                "You are a YouTube video content assistant. Help users analyze video content, suggest topics, titles, thumbnails, and provide YouTube strategy advice.\n\n"
+                f"Video summary:\n{st.session_state.summary}"
+            )
         }
-        st.session_state.messages.append(ass_msg)
+        st.session_state.messages.append(system_msg)
         st.session_state.content_loaded = True
         
     except Exception as e:
@@ -165,27 +554,46 @@ def initialize_with_content(youtube_content):
     
     return True
 
-def get_ai_response_streaming(user_question, response_container):
+def _ollama_stream(messages):
+    """Yield the streamed answer text, batching chunks to limit redraws"""
+    from ollama import chat
+    
+    stream = chat(
+        model=OLLAMA_MODEL,
+        messages=messages,
+        stream=True,
+        options=OLLAMA_OPTIONS,
+        keep_alive=OLLAMA_KEEP_ALIVE,
+    )
+    
+    buffer = ""
+    last_flush = time.monotonic()
+    for chunk in stream:
+        buffer += chunk['message']['content']
+        if len(buffer) > STREAM_FLUSH_CHARS or time.monotonic() - last_flush > STREAM_FLUSH_INTERVAL:
+            yield buffer
+            buffer = ""
+            last_flush = time.monotonic()
+    if buffer:
+        yield buffer
+
+def get_ai_response_streaming(user_question):
+    # Only the summary lives in the conversation, so attach matching transcript excerpts
+    snippets = _retrieve_snippets(user_question, st.session_state.youtube_content or "")
+    if snippets:
+        excerpts = "\n".join(f"- {snippet}" for snippet in snippets)
+        content = f"Relevant transcript excerpts:\n{excerpts}\n\nQuestion: {user_question}"
+    else:
+        content = user_question
+    
     user_msg = {
         "role": "user",
-        "content": user_question
+        "content": content
     }
     st.session_state.messages.append(user_msg)
     
     try:
-        stream = chat(
-            model='llama2',
-            messages=st.session_state.messages,
-            stream=True,
-        )
-        
-        full_response = ""
-        
-        # Stream the response
-        for chunk in stream:
-            content = chunk['message']['content']
-            full_response += content
-            response_container.write(full_response)
+        full_response = st.write_stream(_ollama_stream(st.session_state.messages))
         
         # Add complete response to messages
         ass_msg = {
@@ -197,10 +605,19 @@ def get_ai_response_streaming(user_question, response_container):
         return full_response
         
     except Exception as e:
-        error_msg = f"Error getting AI response: {e}"
-        response_container.error(error_msg)
+        st.error(f"Error getting AI response: {e}")
         return "Sorry, I encountered an error processing your question."
 
+def ask_question(question):
+    """Show the question and stream the answer as chat messages"""
+    st.session_state.chat_history.append({"role": "user", "content": question})
+    with st.chat_message("user"):
+        st.markdown(question)
+    
+    with st.chat_message("assistant"):
+        response = get_ai_response_streaming(question)
+    st.session_state.chat_history.append({"role": "assistant", "content": response})
+
 # Main UI
 st.title("YouTube Content Analyzer")
 st.write("Analyze YouTube videos and get insights about content, titles, and strategy")
@@ -209,11 +626,13 @@ st.write("Analyze YouTube videos and get insights about content, titles, and str
 with st.sidebar:
     st.header("Video Input")
     video_url = st.text_input("Enter YouTube Video URL:", placeholder="https://www.youtube.com/watch?v=...")
+    model_size = st.selectbox("ASR model", ["tiny", "base", "small", "medium", "large-v3"], index=0, help="Larger models transcribe more accurately but slower")
+    accurate = st.toggle("Accurate decoding", value=False, help="Use beam search and previous-text conditioning for better transcripts at higher cost")
     
     if st.button("Analyze Video", type="primary"):
         if video_url:
             with st.spinner("Processing video..."):
-                youtube_content = extract_youtube_content(video_url)
+                youtube_content = extract_youtube_content(video_url, model_size, accurate)
                 
                 if youtube_content:
                     st.session_state.youtube_content = youtube_content
@@ -233,6 +652,7 @@ with st.sidebar:
         if st.button("Clear Analysis"):
             st.session_state.content_loaded = False
             st.session_state.youtube_content = None
+            st.session_state.summary = None
             st.session_state.messages = []
             st.session_state.chat_history = []
             st.rerun()
@@ -248,11 +668,9 @@ if st.session_state.content_loaded and st.session_state.youtube_content:
     st.subheader("Ask Questions About Your Video")
     
     # Display chat history
-    for i, (question, answer) in enumerate(st.session_state.chat_history):
-        with st.container():
-            st.write(f"**Q{i+1}:** {question}")
-            st.write(f"**A{i+1}:** {answer}")
-            st.divider()
+    for message in st.session_state.chat_history:
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
     
     # Question input
     with st.form("question_form"):
@@ -263,22 +681,7 @@ if st.session_state.content_loaded and st.session_state.youtube_content:
             submit_button = st.form_submit_button("Ask", type="primary")
         
         if submit_button and user_question:
-            # Add question to chat history immediately
-            st.session_state.chat_history.append((user_question, ""))
-            
-            # Show the question
-            with st.container():
-                st.write(f"**Q{len(st.session_state.chat_history)}:** {user_question}")
-                st.write(f"**A{len(st.session_state.chat_history)}:**")
-                
-                # Create container for streaming response
-                response_container = st.empty()
-                
-                # Get streaming response
-                response = get_ai_response_streaming(user_question, response_container)
-                
-                # Update chat history with complete response
-                st.session_state.chat_history[-1] = (user_question, response)
+            ask_question(user_question)
     
     # Quick question buttons with streaming
     st.subheader("Quick Questions")
@@ -286,39 +689,15 @@ if st.session_state.content_loaded and st.session_state.youtube_content:
     
     with col1:
         if st.button("Summarize this video"):
-            question = "Provide a comprehensive summary of this video content"
-            st.session_state.chat_history.append((question, ""))
-            
-            with st.container():
-                st.write(f"**Q{len(st.session_state.chat_history)}:** {question}")
-                st.write(f"**A{len(st.session_state.chat_history)}:**")
-                response_container = st.empty()
-                response = get_ai_response_streaming(question, response_container)
-                st.session_state.chat_history[-1] = (question, response)
+            ask_question("Provide a comprehensive summary of this video content")
     
     with col2:
         if st.button("Suggest better titles"):
-            question = "Suggest 5 better, engaging titles for this video content"
-            st.session_state.chat_history.append((question, ""))
-            
-            with st.container():
-                st.write(f"**Q{len(st.session_state.chat_history)}:** {question}")
-                st.write(f"**A{len(st.session_state.chat_history)}:**")
-                response_container = st.empty()
-                response = get_ai_response_streaming(question, response_container)
-                st.session_state.chat_history[-1] = (question, response)
+            ask_question("Suggest 5 better, engaging titles for this video content")
     
     with col3:
         if st.button("Key topics covered"):
-            question = "What are the main topics and key points covered in this video?"
-            st.session_state.chat_history.append((question, ""))
-            
-            with st.container():
-                st.write(f"**Q{len(st.session_state.chat_history)}:** {question}")
-                st.write(f"**A{len(st.session_state.chat_history)}:**")
-                response_container = st.empty()
-                response = get_ai_response_streaming(question, response_container)
-                st.session_state.chat_history[-1] = (question, response)
+            ask_question("What are the main topics and key points covered in this video?")
 
 else:
     st.info("Enter a YouTube URL in the sidebar to get started")